@@ -0,0 +1,93 @@
+"""Guard against cold-start regressions.
+
+Imports the application and builds its services in a fresh interpreter,
+then fails if that took longer than the budget or dragged in any of the
+heavy modules that should only load once there is an offer to send.
+
+    python scripts/import_benchmark.py --budget-ms 400
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = (
+    "PIL",
+    "numpy",
+    "photocollage",
+    "pydantic",
+    "selectolax",
+    "telebot",
+)
+
+PROBE = """
+import json, os, sys, time
+
+sys.path.insert(0, {root!r})
+os.chdir({workdir!r})
+
+start = time.perf_counter()
+from src.core.app_factory import ApplicationFactory
+import src.main
+
+olx_service, database = ApplicationFactory.create_services()
+elapsed = time.perf_counter() - start
+
+olx_service.close()
+database.close()
+
+loaded = sorted(
+    name for name in {heavy!r}
+    if any(m == name or m.startswith(name + ".") for m in sys.modules)
+)
+print(json.dumps({{"elapsed_ms": elapsed * 1000, "heavy_loaded": loaded}}))
+"""
+
+
+def measure(root: str, runs: int) -> tuple[float, list[str]]:
+    timings = []
+    heavy_loaded: set[str] = set()
+
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            code = PROBE.format(root=root, workdir=workdir, heavy=HEAVY_MODULES)
+            output = subprocess.run(
+                [sys.executable, "-c", code],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            timings.append(result["elapsed_ms"])
+            heavy_loaded.update(result["heavy_loaded"])
+
+    return min(timings), sorted(heavy_loaded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best_ms, heavy_loaded = measure(root, args.runs)
+
+    print("Startup: %.1f ms (best of %d)" % (best_ms, args.runs))
+
+    failed = False
+    if heavy_loaded:
+        print("Heavy modules loaded at startup: %s" % ", ".join(heavy_loaded))
+        failed = True
+    if best_ms > args.budget_ms:
+        print("Startup exceeds budget of %.0f ms" % args.budget_ms)
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence
+
+from loguru import logger
+
+from ..core.config import ARCHIVE_DATABASE_NAME, DEFAULT_PRICE_CURRENCY
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from ..core.models import Offer
+
+# Columns that can be loaded through the query API, in table order
+ARCHIVE_COLUMNS = (
+    "offer_id",
+    "refreshed_at",
+    "created_at",
+    "observed_at",
+    "price",
+    "currency",
+    "rooms",
+    "area",
+    "region_id",
+    "city_id",
+    "district_id",
+    "lat",
+    "lon",
+)
+NUMERIC_COLUMNS = tuple(name for name in ARCHIVE_COLUMNS if name != "currency")
+
+FETCH_CHUNK_SIZE = 50_000
+
+
+def _timestamp(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return None
+
+
+def _to_unix(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else int(value.timestamp())
+
+
+class OfferArchive:
+    """Append-only store of parsed offers with numpy-backed aggregations.
+
+    Each (offer_id, refresh time) pair is stored once, so re-seeing an offer
+    on every tick costs nothing while bumps and price changes are kept.
+    Queries read only the latest row of each offer unless ``latest_only`` is
+    turned off, so frequently bumped listings are not over-counted.
+    """
+
+    def __init__(self, database_path: str = ARCHIVE_DATABASE_NAME) -> None:
+        self._connection = sqlite3.connect(database_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+        logger.info("Offer archive initialized: %s" % database_path)
+
+    def _create_tables(self) -> None:
+        create_table_query = """
+        CREATE TABLE IF NOT EXISTS offer_archive (
+            offer_id INTEGER NOT NULL,
+            refreshed_at INTEGER NOT NULL,
+            created_at INTEGER,
+            observed_at INTEGER NOT NULL,
+            price REAL,
+            currency TEXT,
+            rooms INTEGER,
+            area REAL,
+            region_id INTEGER,
+            city_id INTEGER,
+            district_id INTEGER,
+            lat REAL,
+            lon REAL,
+            PRIMARY KEY (offer_id, refreshed_at)
+        ) WITHOUT ROWID
+        """
+        with self._connection:
+            self._connection.execute(create_table_query)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_archive_created "
+                "ON offer_archive (created_at)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_archive_district_created "
+                "ON offer_archive (district_id, created_at)"
+            )
+        logger.debug("Archive tables ensured")
+
+    def add_offers(self, offers: Iterable[Offer]) -> int:
+        observed_at = int(time.time())
+        rows = [self._to_row(offer, observed_at) for offer in offers if offer.id]
+        if not rows:
+            return 0
+
+        query = "INSERT OR IGNORE INTO offer_archive VALUES (%s)" % ",".join(
+            ["?"] * len(ARCHIVE_COLUMNS)
+        )
+        try:
+            with self._connection:
+                inserted = self._connection.executemany(query, rows).rowcount
+        except sqlite3.Error as e:
+            logger.error("Failed to archive %d offers: %s" % (len(rows), e))
+            return 0
+
+        logger.debug("Archived %d of %d offers" % (inserted, len(rows)))
+        return inserted
+
+    def _to_row(self, offer: Offer, observed_at: int) -> tuple[object, ...]:
+        location = offer.location
+        return (
+            offer.id,
+            _timestamp(offer.last_refresh_time) or 0,
+            _timestamp(offer.created_time),
+            observed_at,
+            offer.price,
+            offer.price_currency,
+            offer.rooms,
+            offer.area,
+            location.region.id if location and location.region else None,
+            location.city.id if location and location.city else None,
+            location.district.id if location and location.district else None,
+            offer.map.lat if offer.map else None,
+            offer.map.lon if offer.map else None,
+        )
+
+    def load_columns(
+        self,
+        columns: Sequence[str],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        district_id: Optional[int] = None,
+        not_null: Sequence[str] = (),
+        currency: Optional[str] = None,
+        latest_only: bool = True,
+    ) -> dict[str, np.ndarray]:
+        """Load numeric columns as float64 arrays, NULL becoming NaN.
+
+        ``since``/``until`` filter on ``created_at`` and use its index.
+        With ``latest_only`` each offer contributes only its most recent
+        refresh; otherwise every archived bump is returned.
+        """
+        import numpy as np
+
+        for name in (*columns, *not_null):
+            if name not in NUMERIC_COLUMNS:
+                raise ValueError("Unknown archive column: %s" % name)
+
+        conditions = ["%s IS NOT NULL" % name for name in not_null]
+        params: list[object] = []
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(_to_unix(since))
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(_to_unix(until))
+        if district_id is not None:
+            conditions.append("district_id = ?")
+            params.append(district_id)
+        if currency is not None:
+            conditions.append("currency = ?")
+            params.append(currency)
+        if latest_only:
+            # Seeks the primary key, one lookup per candidate row
+            conditions.append(
+                "refreshed_at = (SELECT MAX(refreshed_at) FROM offer_archive"
+                " AS latest WHERE latest.offer_id = offer_archive.offer_id)"
+            )
+
+        query = "SELECT %s FROM offer_archive" % ", ".join(columns)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        cursor = self._connection.execute(query, params)
+        chunks = []
+        while rows := cursor.fetchmany(FETCH_CHUNK_SIZE):
+            chunks.append(np.array(rows, dtype=np.float64))
+
+        data = (
+            np.concatenate(chunks)
+            if chunks
+            else np.empty((0, len(columns)), dtype=np.float64)
+        )
+        return {name: data[:, index] for index, name in enumerate(columns)}
+
+    def price_percentiles(
+        self,
+        percentiles: Sequence[float] = (25, 50, 75),
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        group_by: str = "district_id",
+        currency: str = DEFAULT_PRICE_CURRENCY,
+        latest_only: bool = True,
+    ) -> dict[int, list[float]]:
+        """Price percentiles per group, e.g. median price per district."""
+        import numpy as np
+
+        data = self.load_columns(
+            (group_by, "price"),
+            since,
+            until,
+            not_null=(group_by, "price"),
+            currency=currency,
+            latest_only=latest_only,
+        )
+        keys, groups = self._group(data[group_by], data["price"])
+        return {
+            int(key): np.percentile(group, percentiles).tolist()
+            for key, group in zip(keys, groups)
+        }
+
+    def counts_per_district(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        latest_only: bool = True,
+    ) -> dict[int, int]:
+        import numpy as np
+
+        data = self.load_columns(
+            ("district_id",),
+            since,
+            until,
+            not_null=("district_id",),
+            latest_only=latest_only,
+        )
+        keys, counts = np.unique(data["district_id"], return_counts=True)
+        return {int(key): int(count) for key, count in zip(keys, counts)}
+
+    def time_buckets(
+        self,
+        bucket_seconds: int = 86400,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        district_id: Optional[int] = None,
+        currency: str = DEFAULT_PRICE_CURRENCY,
+        latest_only: bool = True,
+    ) -> list[tuple[int, int, float]]:
+        """Return (bucket start, offer count, median price) for priced offers."""
+        import numpy as np
+
+        data = self.load_columns(
+            ("created_at", "price"),
+            since,
+            until,
+            district_id=district_id,
+            not_null=("created_at", "price"),
+            currency=currency,
+            latest_only=latest_only,
+        )
+        buckets = data["created_at"] // bucket_seconds * bucket_seconds
+        keys, groups = self._group(buckets, data["price"])
+        return [
+            (int(key), len(group), float(np.median(group)))
+            for key, group in zip(keys, groups)
+        ]
+
+    @staticmethod
+    def _group(
+        keys: np.ndarray, values: np.ndarray
+    ) -> tuple[np.ndarray, list[np.ndarray]]:
+        import numpy as np
+
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        unique_keys, starts = np.unique(sorted_keys, return_index=True)
+        return unique_keys, np.split(values[order], starts[1:])
+
+    def close(self) -> None:
+        self._connection.close()
+        logger.info("Offer archive closed")
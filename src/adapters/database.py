@@ -13,6 +13,10 @@ class DatabaseInterface(Protocol):
         """Remove existing offer IDs from the list."""
         ...
 
+    def has_offer(self, offer_id: int) -> bool:
+        """Check whether an offer ID is already stored."""
+        ...
+
     def add_offer_id(self, offer_id: int) -> None:
         """Add a new offer ID to storage."""
         ...
@@ -53,6 +57,11 @@ class SQLiteDatabase:
             existing_ids = [offer[0] for offer in existing_offers]
             return list(set(offer_ids) - set(existing_ids))
 
+    def has_offer(self, offer_id: int) -> bool:
+        query = "SELECT 1 FROM offers WHERE offer_id = ? LIMIT 1"
+        row = self._cursor.execute(query, (offer_id,)).fetchone()
+        return row is not None
+
     def add_offer_id(self, offer_id: int) -> None:
         try:
             with self._connection:
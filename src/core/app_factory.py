@@ -1,8 +1,16 @@
 from typing import Tuple
 
+from ..adapters.archive import OfferArchive
 from ..adapters.database import SQLiteDatabase
-from ..services.image_service import ImageProcessor
+from ..core.config import (
+    ARCHIVE_ENABLED,
+    COLLAGE_OUTPUT_FORMAT,
+    FILTER_RULES_FILE,
+    load_search_params,
+)
+from ..services.image_service import ImageProcessor, check_output_format
 from ..services.olx_service import OLXScrapingService
+from ..services.rule_engine import RuleEngine
 from ..services.telegram_service import TelegramService
 
 
@@ -10,14 +18,22 @@ class ApplicationFactory:
 
     @staticmethod
     def create_services() -> Tuple[OLXScrapingService, SQLiteDatabase]:
+        # The image processor is built lazily, so a bad format would otherwise
+        # only surface as a failure on every offer
+        check_output_format(COLLAGE_OUTPUT_FORMAT)
+
         database = SQLiteDatabase()
-        telegram_service = TelegramService()
-        image_processor = ImageProcessor()
+        archive = OfferArchive() if ARCHIVE_ENABLED else None
 
+        # Telegram and image services are built on first use, so ticks
+        # without new offers never pay for them
         olx_service = OLXScrapingService(
             database=database,
-            telegram_service=telegram_service,
-            image_processor=image_processor,
+            telegram_service_factory=TelegramService,
+            image_processor_factory=ImageProcessor,
+            search_params=load_search_params(),
+            archive=archive,
+            rule_engine=RuleEngine.from_file(FILTER_RULES_FILE),
         )
 
         return olx_service, database
@@ -1,8 +1,13 @@
+import json
 import os
-from typing import Final
+from typing import Final, Optional
 
 from dotenv import load_dotenv
 
+# INTERVAL as given by the process environment itself, so a reload can fall
+# back to it once the line is removed from .env
+PROCESS_INTERVAL: Final[Optional[str]] = os.environ.get("INTERVAL")
+
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN: Final[str] = os.environ.get("TELEGRAM_BOT_TOKEN", "YOUR_TOKEN")
@@ -10,6 +15,8 @@ TELEGRAM_CHANNEL_ID: Final[int] = int(os.environ.get("TELEGRAM_CHANNEL_ID", "0")
 
 OLX_BASE_URL: Final[str] = "https://www.olx.uz/api/v1/offers"
 OLX_REQUEST_TIMEOUT: Final[float] = 5.0
+# Parse offers incrementally from the response body (requires ijson)
+OLX_STREAMING_INGESTION: Final[bool] = True
 
 # Search Parameters
 SEARCH_PARAMS: Final[dict[str, int | str]] = {
@@ -28,22 +35,72 @@ SEARCH_PARAMS: Final[dict[str, int | str]] = {
     "filter_float_number_of_rooms:to": 6,
     "filter_refiners": "",
 }
+# Optional JSON file whose keys override SEARCH_PARAMS, re-read on SIGHUP
+SEARCH_PARAMS_FILE: Final[str] = os.environ.get(
+    "SEARCH_PARAMS_FILE", "search_params.json"
+)
+# Optional local filter profiles applied to new offers, re-read on SIGHUP
+FILTER_RULES_FILE: Final[str] = os.environ.get(
+    "FILTER_RULES_FILE", "filter_rules.json"
+)
+FILTER_GRID_CELL_DEGREES: Final[float] = 0.01  # ~1 km
 
 DATABASE_NAME: Final[str] = "offers.db"
 
+# Append-only history of every offer seen, for price/area analytics
+ARCHIVE_ENABLED: Final[bool] = True
+ARCHIVE_DATABASE_NAME: Final[str] = "archive.db"
+ARCHIVE_BATCH_SIZE: Final[int] = 500
+# Listings are priced in UYE or UZS; price statistics never mix the two
+DEFAULT_PRICE_CURRENCY: Final[str] = "UYE"
+
 LOGGING_LEVEL: Final[str] = "INFO"
 LOG_TO_FILE: Final[bool] = True
 
+# Tick profiling (also enabled with --profile)
+PROFILE_TICKS: Final[bool] = os.environ.get("PROFILE_TICKS", "0") == "1"
+PROFILE_SLOW_TICK_SECONDS: Final[float] = float(
+    os.environ.get("PROFILE_SLOW_TICK_SECONDS", 60)
+)
+PROFILE_DIR: Final[str] = "logs/profiles"
+PROFILE_MAX_FILES: Final[int] = 20
+
 COLLAGE_OUTPUT_WIDTH: Final[int] = 3840
 COLLAGE_OUTPUT_HEIGHT: Final[int] = 2160
 COLLAGE_BORDER_WIDTH: Final[float] = 0.006
+COLLAGE_OUTPUT_FORMAT: Final[str] = "JPEG"  # JPEG/WEBP
+COLLAGE_QUALITY: Final[int] = 75
+COLLAGE_MIN_QUALITY: Final[int] = 30
+# Lower the quality until the encoded collage fits (None = no limit)
+COLLAGE_TARGET_BYTES: Final[Optional[int]] = None
+COLLAGE_OPTIMIZE: Final[bool] = False
+COLLAGE_PROGRESSIVE: Final[bool] = False
 MAX_DOWNLOAD_WORKERS: Final[int] = 5
 MAX_ASPECT_RATIO: Final[float] = 1.5
+# Only the first N listing photos go into a collage (cover photo first)
+COLLAGE_MAX_PHOTOS: Final[int] = 12
+# Collages decoded/rendered at the same time across the process
+MAX_CONCURRENT_RENDERS: Final[int] = 1
 
-SCHEDULER_INTERVAL_SECONDS: Final[int] = int(os.environ.get("INTERVAL", 30))
+DEFAULT_SCHEDULER_INTERVAL_SECONDS: Final[int] = 30
+SCHEDULER_INTERVAL_SECONDS: Final[int] = int(
+    os.environ.get("INTERVAL", DEFAULT_SCHEDULER_INTERVAL_SECONDS)
+)
+# Time allowed to finish in-flight offers after SIGTERM (keep below the
+# unit's TimeoutStopSec)
+SHUTDOWN_TIMEOUT_SECONDS: Final[float] = 25.0
 MESSAGE_DELAY_SECONDS: Final[list[int]] = [1, 2, 3]
 MAX_DESCRIPTION_LENGTH: Final[int] = 800
 
 DOWNLOADS_DIR: Final[str] = "downloads"
 TEMP_PHOTOS_PREFIX: Final[str] = "photos_"
 PHOTO_COLLAGE_DIR: Final[str] = "photo_collages"
+COLLAGE_FILE_PREFIX: Final[str] = "collage-"
+
+
+def load_search_params() -> dict[str, int | str]:
+    params = dict(SEARCH_PARAMS)
+    if os.path.exists(SEARCH_PARAMS_FILE):
+        with open(SEARCH_PARAMS_FILE, encoding="utf-8") as f:
+            params.update(json.load(f))
+    return params
@@ -1,14 +1,27 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, ConfigDict
 
 
+def _to_float(value: object) -> Optional[float]:
+    # Handles 250, "250" and labels such as "60 м²" or "2,5"
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(",", ".").split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
 class Base(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
 
 class Value(Base):
+    key: Optional[str] = None  # e.g. "2" for number_of_rooms
+    value: Optional[Union[float, str]] = None  # numeric price
+    currency: Optional[str] = None
     label: Optional[str] = None
 
 
@@ -75,3 +88,30 @@ class Offer(Base):
             return created_dt.date() == now_utc.date()
         except ValueError:
             return False
+
+    def get_param(self, key: str) -> Optional[Value]:
+        for param in self.params or []:
+            if param.key == key:
+                return param.value
+        return None
+
+    @property
+    def price(self) -> Optional[float]:
+        value = self.get_param("price")
+        return _to_float(value.value) if value else None
+
+    @property
+    def price_currency(self) -> Optional[str]:
+        value = self.get_param("price")
+        return value.currency if value else None
+
+    @property
+    def rooms(self) -> Optional[int]:
+        value = self.get_param("number_of_rooms")
+        rooms = _to_float(value.key or value.label) if value else None
+        return int(rooms) if rooms is not None else None
+
+    @property
+    def area(self) -> Optional[float]:
+        value = self.get_param("total_area")
+        return _to_float(value.key or value.label) if value else None
@@ -1,45 +1,147 @@
+import argparse
 import sys
 import time
 from contextlib import suppress
+from typing import Callable, Optional
 
 import schedule
+from dotenv import dotenv_values
 from loguru import logger
 
+from . import __description__
 from .core.app_factory import ApplicationFactory
-from .core.config import LOG_TO_FILE, LOGGING_LEVEL, SCHEDULER_INTERVAL_SECONDS
+from .core.config import (
+    DEFAULT_SCHEDULER_INTERVAL_SECONDS,
+    FILTER_RULES_FILE,
+    LOG_TO_FILE,
+    LOGGING_LEVEL,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+    PROFILE_SLOW_TICK_SECONDS,
+    PROFILE_TICKS,
+    PROCESS_INTERVAL,
+    SCHEDULER_INTERVAL_SECONDS,
+    SHUTDOWN_TIMEOUT_SECONDS,
+    load_search_params,
+)
+from .services.image_service import sweep_orphaned_artifacts
+from .services.olx_service import OLXScrapingService
+from .services.rule_engine import RuleEngine
 from .utils.logging_utils import handle_exception, setup_logging
+from .utils.profiling_utils import TickProfiler
+from .utils.signal_utils import ShutdownTimeout, SignalHandler
 
 
-def main() -> None:
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__description__)
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="run a single fetch tick and exit (for cron)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=PROFILE_TICKS,
+        help="profile each tick and save slow ones to %s" % PROFILE_DIR,
+    )
+    return parser.parse_args(argv)
+
+
+def schedule_ticks(tick: Callable[[], None], interval: int) -> None:
+    schedule.clear()
+    schedule.every(interval).seconds.do(tick)
+    logger.info("Scheduled scraping every %d second(s)" % interval)
+
+
+def read_interval() -> int:
+    # .env is parsed without touching os.environ, so a rejected value cannot
+    # outlive the reload that rejected it
+    value = dotenv_values().get("INTERVAL") or PROCESS_INTERVAL
+    interval = int(value) if value else DEFAULT_SCHEDULER_INTERVAL_SECONDS
+    if interval <= 0:
+        raise ValueError("INTERVAL must be positive, got %d" % interval)
+    return interval
+
+
+def reload_config(olx_service: OLXScrapingService, tick: Callable[[], None]) -> None:
+    logger.info("Reloading configuration")
+    # Parse everything before applying anything, so a bad value leaves the
+    # running configuration untouched
+    try:
+        interval = read_interval()
+        search_params = load_search_params()
+        rule_engine = RuleEngine.from_file(FILTER_RULES_FILE)
+    except (OSError, ValueError, TypeError) as e:
+        logger.error("Failed to reload configuration, keeping current: %s" % e)
+        return
+
+    olx_service.reload(search_params, rule_engine)
+    schedule_ticks(tick, interval)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+
     setup_logging(LOGGING_LEVEL, LOG_TO_FILE)
     sys.excepthook = handle_exception
 
     logger.info("Starting OLX Parser application")
 
+    sweep_orphaned_artifacts()
     olx_service, database = ApplicationFactory.create_services()
 
-    schedule.every(SCHEDULER_INTERVAL_SECONDS).seconds.do(
-        olx_service.fetch_and_process_offers
+    signals = SignalHandler(
+        SHUTDOWN_TIMEOUT_SECONDS, on_terminate=olx_service.request_stop
     )
-    logger.info("Scheduled scraping every %d second(s)" % SCHEDULER_INTERVAL_SECONDS)
+    signals.install()
+
+    tick = olx_service.fetch_and_process_offers
+    if args.profile:
+        profiler = TickProfiler(
+            PROFILE_SLOW_TICK_SECONDS, PROFILE_DIR, PROFILE_MAX_FILES
+        )
+        tick = profiler.wrap(tick)
+        logger.info(
+            "Profiling ticks slower than %.0f second(s)" % PROFILE_SLOW_TICK_SECONDS
+        )
 
     try:
         # Run initial scrape
         logger.info("Running initial offer fetch")
-        olx_service.fetch_and_process_offers()
+        tick()
+
+        if args.once:
+            return
+
+        schedule_ticks(tick, SCHEDULER_INTERVAL_SECONDS)
+
+        while not signals.terminating.is_set():
+            if signals.reload_requested.is_set():
+                signals.reload_requested.clear()
+                reload_config(olx_service, tick)
 
-        while True:
             schedule.run_pending()
             time.sleep(1)
 
+        logger.info("Received SIGTERM, shutting down gracefully")
+
     except KeyboardInterrupt:
         logger.info("Shutting down gracefully")
 
+    except ShutdownTimeout:
+        logger.warning(
+            "In-flight work did not finish within %.0f second(s), aborting"
+            % SHUTDOWN_TIMEOUT_SECONDS
+        )
+
     except Exception as e:
         logger.critical("Fatal error in main loop: %s" % e)
         raise
 
     finally:
+        signals.disarm()
+
         with suppress(Exception):
             olx_service.close()
 
@@ -1,33 +1,109 @@
+from __future__ import annotations
+
 import concurrent.futures
+import io
 import math
 import os
 import random
 import shutil
+import threading
+import time
 from contextlib import suppress
 from os import walk
 from os.path import join
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import requests
 from loguru import logger
-from photocollage import render
-from photocollage.collage import Page, Photo
 
 from ..core.config import (
     COLLAGE_BORDER_WIDTH,
+    COLLAGE_FILE_PREFIX,
+    COLLAGE_MAX_PHOTOS,
+    COLLAGE_MIN_QUALITY,
+    COLLAGE_OPTIMIZE,
+    COLLAGE_OUTPUT_FORMAT,
     COLLAGE_OUTPUT_HEIGHT,
     COLLAGE_OUTPUT_WIDTH,
+    COLLAGE_PROGRESSIVE,
+    COLLAGE_QUALITY,
+    COLLAGE_TARGET_BYTES,
     DOWNLOADS_DIR,
     MAX_ASPECT_RATIO,
+    MAX_CONCURRENT_RENDERS,
     MAX_DOWNLOAD_WORKERS,
     PHOTO_COLLAGE_DIR,
     TEMP_PHOTOS_PREFIX,
 )
+from ..utils.memory_utils import get_peak_rss_mb, reset_peak_rss
+
+if TYPE_CHECKING:
+    from photocollage.collage import Page, Photo
+    from PIL.Image import Image
+
+OUTPUT_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+# Shared by all ImageProcessor instances so concurrent offers cannot stack
+# several full-size canvases in memory at once
+_render_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_RENDERS)
+
+
+def check_output_format(output_format: str) -> str:
+    """Return the normalized collage format, raising ValueError if unsupported."""
+    output_format = output_format.upper()
+    if output_format not in OUTPUT_EXTENSIONS:
+        raise ValueError("Unsupported collage format: %s" % output_format)
+    return output_format
+
+
+def sweep_orphaned_artifacts() -> int:
+    """Remove temp photo folders and collages left by an interrupted run."""
+    removed = 0
+    for folder, prefix in (
+        (DOWNLOADS_DIR, TEMP_PHOTOS_PREFIX),
+        (PHOTO_COLLAGE_DIR, COLLAGE_FILE_PREFIX),
+    ):
+        if not os.path.isdir(folder):
+            continue
+
+        for name in os.listdir(folder):
+            if not name.startswith(prefix):
+                continue
+
+            path = join(folder, name)
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.unlink(path)
+                removed += 1
+            except OSError as e:
+                logger.warning("Failed to remove orphaned %s: %s" % (path, e))
+
+    if removed:
+        logger.info("Removed %d orphaned artifact(s) from a previous run" % removed)
+    return removed
 
 
 class ImageProcessor:
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        output_width: int = COLLAGE_OUTPUT_WIDTH,
+        output_height: int = COLLAGE_OUTPUT_HEIGHT,
+        output_format: str = COLLAGE_OUTPUT_FORMAT,
+        quality: int = COLLAGE_QUALITY,
+        target_bytes: Optional[int] = COLLAGE_TARGET_BYTES,
+        optimize: bool = COLLAGE_OPTIMIZE,
+        progressive: bool = COLLAGE_PROGRESSIVE,
+    ) -> None:
+        self.output_width = output_width
+        self.output_height = output_height
+        self.output_format = check_output_format(output_format)
+        self.quality = quality
+        self.target_bytes = target_bytes
+        self.optimize = optimize
+        self.progressive = progressive
         self._ensure_directories()
 
     def _ensure_directories(self) -> None:
@@ -41,6 +117,13 @@ class ImageProcessor:
             logger.warning("No images provided for offer %s" % offer_id)
             return None
 
+        if len(image_urls) > COLLAGE_MAX_PHOTOS:
+            logger.debug(
+                "Using first %d of %d photos for offer %s"
+                % (COLLAGE_MAX_PHOTOS, len(image_urls), offer_id)
+            )
+            image_urls = image_urls[:COLLAGE_MAX_PHOTOS]
+
         temp_folder = os.path.join(DOWNLOADS_DIR, f"{TEMP_PHOTOS_PREFIX}{offer_id}")
 
         try:
@@ -48,6 +131,9 @@ class ImageProcessor:
                 logger.error("Failed to download images for offer %s" % offer_id)
                 return None
 
+            # photocollage pulls in PIL, keep it off the startup path
+            from photocollage import render
+
             image_files = self._get_image_files(temp_folder)
             if not image_files:
                 logger.warning("No valid images found for offer %s" % offer_id)
@@ -62,8 +148,21 @@ class ImageProcessor:
                 )
                 return None
 
-            output_path = os.path.join(PHOTO_COLLAGE_DIR, f"collage-{offer_id}.jpg")
-            return self._generate_collage(output_path, filtered_photos)
+            extension = OUTPUT_EXTENSIONS[self.output_format]
+            output_path = os.path.join(
+                PHOTO_COLLAGE_DIR, f"{COLLAGE_FILE_PREFIX}{offer_id}.{extension}"
+            )
+            with _render_semaphore:
+                reset_peak_rss()
+                collage_path = self._generate_collage(output_path, filtered_photos)
+                peak_rss = get_peak_rss_mb()
+
+            if peak_rss is not None:
+                logger.info(
+                    "Collage for offer %s: %d photos, peak RSS %.1f MB"
+                    % (offer_id, len(filtered_photos), peak_rss)
+                )
+            return collage_path
 
         except Exception as e:
             logger.error("Error creating collage for offer %s: %s" % (offer_id, e))
@@ -131,8 +230,11 @@ class ImageProcessor:
         return filtered
 
     def _generate_collage(self, output_path: str, photos: list[Photo]) -> str:
+        from photocollage import render
+        from photocollage.collage import Page
+
         # Calculate optimal grid layout
-        ratio = COLLAGE_OUTPUT_HEIGHT / COLLAGE_OUTPUT_WIDTH
+        ratio = self.output_height / self.output_width
         avg_ratio = sum(photo.h / photo.w for photo in photos) / len(photos)
         virtual_image_count = 2 * len(photos)
         columns = int(round(math.sqrt(avg_ratio / ratio * virtual_image_count)))
@@ -146,25 +248,134 @@ class ImageProcessor:
 
         # Adjust layout and scaling
         page.adjust()
-        page.target_ratio = COLLAGE_OUTPUT_HEIGHT / COLLAGE_OUTPUT_WIDTH
+        page.target_ratio = ratio
         page.adjust_cols_heights()
-        page.scale_to_fit(COLLAGE_OUTPUT_WIDTH, COLLAGE_OUTPUT_HEIGHT)
+        page.scale_to_fit(self.output_width, self.output_height)
 
-        enlargement = float(COLLAGE_OUTPUT_WIDTH) / page.w
+        enlargement = float(self.output_width) / page.w
         page.scale(enlargement)
 
+        # Shrink source files to their cell size before photocollage decodes
+        # them at full resolution
+        self._downscale_to_cells(page)
+
         # Create rendering task
         border_width = COLLAGE_BORDER_WIDTH * max(page.w, page.h)
         border_color = (255, 255, 255)
         # border_color = render.random_color()
 
+        # Keep the canvas instead of letting photocollage save it with
+        # default PIL settings, so the encoding stays configurable
+        rendered: list[Image] = []
         task = render.RenderingTask(
             page=page,
-            output_file=output_path,
+            on_complete=rendered.append,
             on_fail=lambda x: logger.exception(x),
             border_width=border_width,
             border_color=border_color,
         )
-        task.run()
+        try:
+            task.run()
+        finally:
+            # photocollage keeps every resized photo in a module-level cache
+            render.cache.clear()
+
+        if not rendered:
+            raise RuntimeError("Collage rendering failed")
+
+        self._save_collage(rendered[0], output_path)
+        return output_path
+
+    def _save_collage(self, canvas: Image, output_path: str) -> None:
+        start = time.perf_counter()
+        quality = self.quality
+        data = self._encode(canvas, quality)
+        passes = 1
+
+        if self.target_bytes is not None and len(data) > self.target_bytes:
+            # Binary search for the highest quality that fits the target
+            low, high = COLLAGE_MIN_QUALITY, quality - 1
+            best: Optional[tuple[int, bytes]] = None
+            # Lowest quality encoded so far, used when nothing fits
+            fallback = (quality, data)
+            while low <= high:
+                mid = (low + high) // 2
+                candidate = self._encode(canvas, mid)
+                passes += 1
+                if len(candidate) <= self.target_bytes:
+                    best = (mid, candidate)
+                    low = mid + 1
+                else:
+                    fallback = (mid, candidate)
+                    high = mid - 1
+
+            if best is not None:
+                quality, data = best
+            else:
+                # The search ends on COLLAGE_MIN_QUALITY, so reuse that encode
+                quality, data = fallback
+                logger.warning(
+                    "Collage exceeds target of %d bytes even at quality %d"
+                    % (self.target_bytes, quality)
+                )
+
+        with open(output_path, "wb") as f:
+            f.write(data)
+
+        logger.info(
+            "Encoded collage %s: %s q=%d, %d bytes, %d pass(es), %.0f ms"
+            % (
+                output_path,
+                self.output_format,
+                quality,
+                len(data),
+                passes,
+                (time.perf_counter() - start) * 1000,
+            )
+        )
 
-        return str(task.output_file)
+    def _encode(self, canvas: Image, quality: int) -> bytes:
+        options: dict[str, object] = {"quality": quality}
+        if self.output_format == "JPEG":
+            options["optimize"] = self.optimize
+            options["progressive"] = self.progressive
+        else:
+            # WebP has no progressive mode; method 6 is its slowest, smallest
+            options["method"] = 6 if self.optimize else 4
+
+        buffer = io.BytesIO()
+        canvas.save(buffer, self.output_format, **options)
+        return buffer.getvalue()
+
+    def _downscale_to_cells(self, page: Page) -> None:
+        from PIL import Image, ImageOps
+
+        for col in page.cols:
+            for cell in col.cells:
+                if cell.is_extension():
+                    continue
+
+                photo = cell.photo
+                _, _, content_w, content_h = cell.content_coords()
+                target = (math.ceil(content_w), math.ceil(content_h))
+
+                with Image.open(photo.filename) as img:
+                    # EXIF rotations 6 and 8 swap the stored width and height
+                    swapped = photo.orientation in (6, 8)
+                    stored_target = target[::-1] if swapped else target
+                    if (
+                        img.width <= stored_target[0]
+                        or img.height <= stored_target[1]
+                    ):
+                        continue
+
+                    # Let the JPEG decoder skip detail via DCT scaling
+                    img.draft("RGB", stored_target)
+                    resized = ImageOps.exif_transpose(img).resize(
+                        target, Image.Resampling.LANCZOS
+                    )
+
+                if resized.mode != "RGB":
+                    resized = resized.convert("RGB")
+                resized.save(photo.filename, "JPEG", quality=95)
+                photo.orientation = 0
@@ -1,13 +1,51 @@
-from typing import Any, Optional
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 import requests
+import urllib3
 from loguru import logger
 
 from ..adapters.database import DatabaseInterface
-from ..core.config import OLX_BASE_URL, OLX_REQUEST_TIMEOUT, SEARCH_PARAMS
-from ..core.models import Offer
-from ..services.image_service import ImageProcessor
-from ..services.telegram_service import TelegramService
+from ..core.config import (
+    ARCHIVE_BATCH_SIZE,
+    OLX_BASE_URL,
+    OLX_REQUEST_TIMEOUT,
+    OLX_STREAMING_INGESTION,
+    SEARCH_PARAMS,
+)
+
+if TYPE_CHECKING:
+    from ..adapters.archive import OfferArchive
+    from ..core.models import Offer
+    from ..services.image_service import ImageProcessor
+    from ..services.rule_engine import RuleEngine
+    from ..services.telegram_service import TelegramService
+
+try:
+    import ijson
+except ImportError:  # streaming ingestion is optional
+    ijson = None
+
+
+class _AvailableBytesReader:
+    """Hands ijson whatever bytes have arrived instead of a full buffer.
+
+    urllib3's read(n) blocks until n bytes are in, so offers already on the
+    wire would wait for (or be lost with) the rest of a 64 KiB chunk.
+    """
+
+    def __init__(self, raw: Any) -> None:
+        # read1 needs urllib3 2.x; older versions fall back to read
+        self._read = getattr(raw, "read1", raw.read)
+
+    def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            # ijson probes with read(0) to tell bytes from text streams
+            return b""
+        data: bytes = self._read(size if size > 0 else None)
+        return data
 
 
 class OLXScrapingService:
@@ -15,27 +53,80 @@ class OLXScrapingService:
     def __init__(
         self,
         database: DatabaseInterface,
-        telegram_service: TelegramService,
-        image_processor: ImageProcessor,
+        telegram_service_factory: Callable[[], TelegramService],
+        image_processor_factory: Callable[[], ImageProcessor],
+        search_params: Optional[dict[str, int | str]] = None,
+        archive: Optional[OfferArchive] = None,
+        rule_engine: Optional[RuleEngine] = None,
     ) -> None:
         self.database = database
-        self.telegram_service = telegram_service
-        self.image_processor = image_processor
+        self.archive = archive
+        self.rule_engine = rule_engine
+        self.search_params = dict(search_params or SEARCH_PARAMS)
+        self._telegram_service_factory = telegram_service_factory
+        self._image_processor_factory = image_processor_factory
+        self._telegram_service: Optional[TelegramService] = None
+        self._image_processor: Optional[ImageProcessor] = None
         self.session = requests.Session()
+        self._stop_requested = threading.Event()
         logger.info("OLX scraping service initialized")
 
+    @property
+    def telegram_service(self) -> TelegramService:
+        if self._telegram_service is None:
+            self._telegram_service = self._telegram_service_factory()
+        return self._telegram_service
+
+    @property
+    def image_processor(self) -> ImageProcessor:
+        if self._image_processor is None:
+            self._image_processor = self._image_processor_factory()
+        return self._image_processor
+
+    def request_stop(self) -> None:
+        """Stop picking up new offers; the one in progress is finished.
+
+        Only sets a flag, so it is safe to call from a signal handler.
+        """
+        self._stop_requested.set()
+
+    def reload(
+        self,
+        search_params: dict[str, int | str],
+        rule_engine: Optional[RuleEngine] = None,
+    ) -> None:
+        """Swap search parameters and filter rules, keeping the HTTP session."""
+        self.search_params = dict(search_params)
+        self.rule_engine = rule_engine
+        logger.info("Search parameters reloaded: %s" % self.search_params)
+
     def fetch_and_process_offers(self) -> None:
+        if self._stop_requested.is_set():
+            return
+
         try:
-            offers_data = self._fetch_offers_from_api()
-            if not offers_data:
-                logger.warning("No offers data received from API")
-                return
+            if OLX_STREAMING_INGESTION and ijson is not None:
+                new_offers = self._stream_new_offers()
+            else:
+                offers_data = self._fetch_offers_from_api()
+                if not offers_data:
+                    logger.warning("No offers data received from API")
+                    return
+
+                new_offers = self._filter_new_offers(offers_data)
 
-            new_offers = self._filter_new_offers(offers_data)
-            logger.info("Found %d new offers to process" % len(new_offers))
+            routed_offers = self._route_offers(new_offers)
+            logger.info("Found %d new offers to process" % len(routed_offers))
 
-            for offer in new_offers:
-                self._process_single_offer(offer)
+            for index, (offer, channel_ids) in enumerate(routed_offers):
+                if self._stop_requested.is_set():
+                    # Unsent offers are not stored, so the next run picks them up
+                    logger.info(
+                        "Stop requested, leaving %d offer(s) for the next run"
+                        % (len(routed_offers) - index)
+                    )
+                    break
+                self._process_single_offer(offer, channel_ids)
 
         except Exception as e:
             logger.exception("Error in fetch_and_process_offers: %s" % e)
@@ -43,7 +134,9 @@ class OLXScrapingService:
     def _fetch_offers_from_api(self) -> list[dict[str, Any]]:
         try:
             response = self.session.get(
-                OLX_BASE_URL, params=SEARCH_PARAMS, timeout=OLX_REQUEST_TIMEOUT
+                OLX_BASE_URL,
+                params=self.search_params,
+                timeout=OLX_REQUEST_TIMEOUT,
             )
             response.raise_for_status()
 
@@ -65,8 +158,72 @@ class OLXScrapingService:
             logger.error("Invalid JSON response: %s" % e)
             return []
 
+    def _stream_new_offers(self) -> list[Offer]:
+        from ..core.models import Offer
+
+        new_offers: list[Offer] = []
+        archive_batch: list[Offer] = []
+        seen_ids: set[int] = set()
+        total = 0
+
+        try:
+            with self.session.get(
+                OLX_BASE_URL,
+                params=self.search_params,
+                timeout=OLX_REQUEST_TIMEOUT,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                # Let urllib3 undo gzip/deflate before ijson sees the bytes
+                response.raw.decode_content = True
+
+                offers_data = ijson.items(
+                    _AvailableBytesReader(response.raw), "data.item", use_float=True
+                )
+                for offer_data in offers_data:
+                    total += 1
+                    offer = Offer(**offer_data)
+
+                    if self.archive is not None:
+                        archive_batch.append(offer)
+                        if len(archive_batch) >= ARCHIVE_BATCH_SIZE:
+                            self.archive.add_offers(archive_batch)
+                            archive_batch.clear()
+
+                    if not offer.id or offer.id in seen_ids:
+                        continue
+                    if not offer.is_created_today:
+                        continue
+                    if self.database.has_offer(offer.id):
+                        continue
+
+                    seen_ids.add(offer.id)
+                    new_offers.append(offer)
+
+        # ijson reads response.raw, so errors mid-body come from urllib3
+        # without being wrapped by requests
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            logger.error("API request failed: %s" % e)
+        except ijson.JSONError as e:
+            logger.error("Invalid JSON response: %s" % e)
+        finally:
+            if self.archive is not None and archive_batch:
+                self.archive.add_offers(archive_batch)
+
+        if not total:
+            logger.warning("API response contains no data")
+
+        logger.debug("Streamed %d offers, kept %d" % (total, len(new_offers)))
+        # Reverse order to process oldest first
+        return new_offers[::-1]
+
     def _filter_new_offers(self, offers_data: list[dict[str, Any]]) -> list[Offer]:
+        from ..core.models import Offer
+
         offers = [Offer(**offer_data) for offer_data in offers_data]
+        if self.archive is not None:
+            self.archive.add_offers(offers)
+
         todays_offers = [offer for offer in offers if offer.is_created_today]
 
         remaining_offers = self.database.remove_existing_offers(
@@ -75,7 +232,37 @@ class OLXScrapingService:
         logger.debug("New offer IDs: %s" % remaining_offers)
         return [offer for offer in offers if offer.id in remaining_offers]
 
-    def _process_single_offer(self, offer: Offer) -> None:
+    def _route_offers(
+        self, offers: list[Offer]
+    ) -> list[tuple[Offer, Optional[list[int]]]]:
+        if self.rule_engine is None:
+            return [(offer, None) for offer in offers]
+
+        routed_offers: list[tuple[Offer, Optional[list[int]]]] = []
+        for offer in offers:
+            profiles = self.rule_engine.route(offer)
+            if not profiles:
+                logger.debug("Offer %s rejected by local filters" % offer.id)
+                continue
+
+            logger.debug(
+                "Offer %s matched profile(s): %s"
+                % (offer.id, ", ".join(profile.name for profile in profiles))
+            )
+            # Several profiles may share a channel; send there only once
+            channel_ids = list(dict.fromkeys(p.channel_id for p in profiles))
+            routed_offers.append((offer, channel_ids))
+
+        if len(routed_offers) < len(offers):
+            logger.info(
+                "Local filters rejected %d of %d new offers"
+                % (len(offers) - len(routed_offers), len(offers))
+            )
+        return routed_offers
+
+    def _process_single_offer(
+        self, offer: Offer, channel_ids: Optional[list[int]] = None
+    ) -> None:
         if not offer.id:
             logger.warning("Offer missing ID, skipping")
             return
@@ -85,7 +272,9 @@ class OLXScrapingService:
             photo = self._create_offer_collage(offer)
 
             # Send message to Telegram
-            success = self.telegram_service.send_offer_message(offer, photo)
+            success = self.telegram_service.send_offer_message(
+                offer, photo, channel_ids
+            )
 
             if success:
                 logger.info("Successfully processed: %s" % offer.url)
@@ -125,4 +314,6 @@ class OLXScrapingService:
 
     def close(self) -> None:
         self.session.close()
+        if self.archive is not None:
+            self.archive.close()
         logger.info("OLX scraping service closed")
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+from loguru import logger
+
+from ..core.config import (
+    DEFAULT_PRICE_CURRENCY,
+    FILTER_GRID_CELL_DEGREES,
+    TELEGRAM_CHANNEL_ID,
+)
+
+if TYPE_CHECKING:
+    from ..core.models import Offer
+
+Predicate = Callable[["Offer"], bool]
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+class Circle:
+
+    def __init__(self, lat: float, lon: float, radius_km: float) -> None:
+        self.lat = lat
+        self.lon = lon
+        self.radius_km = radius_km
+
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        self.bbox = (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+    def contains(self, lat: float, lon: float) -> bool:
+        # Haversine distance
+        phi1, phi2 = math.radians(self.lat), math.radians(lat)
+        dphi = phi2 - phi1
+        dlambda = math.radians(lon - self.lon)
+        a = (
+            math.sin(dphi / 2) ** 2
+            + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+        )
+        distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+        return distance <= self.radius_km
+
+
+class Polygon:
+
+    def __init__(self, points: Sequence[Sequence[float]]) -> None:
+        if len(points) < 3:
+            raise ValueError("Polygon needs at least 3 [lat, lon] points")
+
+        self.points = [(float(lat), float(lon)) for lat, lon in points]
+        lats = [lat for lat, _ in self.points]
+        lons = [lon for _, lon in self.points]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+    def contains(self, lat: float, lon: float) -> bool:
+        # Ray casting along the latitude line
+        inside = False
+        j = len(self.points) - 1
+        for i, (lat_i, lon_i) in enumerate(self.points):
+            lat_j, lon_j = self.points[j]
+            if (lat_i > lat) != (lat_j > lat):
+                crossing = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+                if lon < crossing:
+                    inside = not inside
+            j = i
+        return inside
+
+
+Area = Circle | Polygon
+
+PROFILE_KEYS = {
+    "name",
+    "channel_id",
+    "currency",
+    "areas",
+    "exclude_title_keywords",
+    "price",
+    "rooms",
+    "area",
+    "price_per_room",
+}
+
+
+class GridIndex:
+    """Buckets areas by the lat/lon grid cells their bounding boxes touch.
+
+    A lookup only runs exact containment tests for the handful of areas
+    registered in the point's cell.
+    """
+
+    def __init__(self, cell_degrees: float = FILTER_GRID_CELL_DEGREES) -> None:
+        self.cell_degrees = cell_degrees
+        self.areas: list[Area] = []
+        self._cells: dict[tuple[int, int], list[int]] = {}
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_degrees),
+            math.floor(lon / self.cell_degrees),
+        )
+
+    def add(self, area: Area) -> int:
+        area_id = len(self.areas)
+        self.areas.append(area)
+
+        min_row, min_col = self._cell(area.bbox[0], area.bbox[1])
+        max_row, max_col = self._cell(area.bbox[2], area.bbox[3])
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self._cells.setdefault((row, col), []).append(area_id)
+        return area_id
+
+    def lookup(self, lat: float, lon: float) -> set[int]:
+        candidates = self._cells.get(self._cell(lat, lon), ())
+        return {
+            area_id
+            for area_id in candidates
+            if self.areas[area_id].contains(lat, lon)
+        }
+
+
+class Profile:
+    """A named rule set and the Telegram channel its matches are sent to."""
+
+    def __init__(
+        self,
+        name: str,
+        predicates: list[Predicate],
+        area_ids: set[int],
+        channel_id: int = TELEGRAM_CHANNEL_ID,
+    ) -> None:
+        self.name = name
+        self.predicates = predicates
+        self.area_ids = area_ids
+        self.channel_id = channel_id
+
+    def matches(self, offer: Offer, matched_areas: set[int]) -> bool:
+        if self.area_ids and not self.area_ids & matched_areas:
+            return False
+        return all(predicate(offer) for predicate in self.predicates)
+
+
+def _expect(value: Any, kind: type | tuple[type, ...], what: str) -> Any:
+    # bool is an int subclass but never a valid number here
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ValueError("%s has invalid value %r" % (what, value))
+    return value
+
+
+def _expect_keys(spec: dict[str, Any], allowed: set[str], what: str) -> None:
+    # A misspelled key would otherwise silently switch its rule off
+    unknown = set(spec) - allowed
+    if unknown:
+        raise ValueError("%s has unknown keys: %s" % (what, ", ".join(sorted(unknown))))
+
+
+def _range_predicate(
+    getter: Callable[[Offer], Optional[float]], spec: Any, what: str
+) -> Predicate:
+    _expect(spec, dict, what)
+    _expect_keys(spec, {"min", "max"}, what)
+    low = _expect(spec.get("min", -math.inf), (int, float), what + ".min")
+    high = _expect(spec.get("max", math.inf), (int, float), what + ".max")
+
+    def predicate(offer: Offer) -> bool:
+        # Offers missing the value cannot be shown to satisfy the rule
+        value = getter(offer)
+        return value is not None and low <= value <= high
+
+    return predicate
+
+
+def _price_getter(currency: str) -> Callable[[Offer], Optional[float]]:
+    # UYE and UZS prices differ by ~4 orders of magnitude, so a price in
+    # another currency cannot be checked against the rule
+    def price(offer: Offer) -> Optional[float]:
+        return offer.price if offer.price_currency == currency else None
+
+    return price
+
+
+def _price_per_room_getter(currency: str) -> Callable[[Offer], Optional[float]]:
+    get_price = _price_getter(currency)
+
+    def price_per_room(offer: Offer) -> Optional[float]:
+        price, rooms = get_price(offer), offer.rooms
+        if price is None or not rooms:
+            return None
+        return price / rooms
+
+    return price_per_room
+
+
+def _compile_predicates(rules: dict[str, Any], what: str) -> list[Predicate]:
+    # Cheapest checks first, so most rejections never reach the others
+    predicates: list[Predicate] = []
+
+    keywords = _expect(
+        rules.get("exclude_title_keywords", []), list, what + ".exclude_title_keywords"
+    )
+    if keywords:
+        for keyword in keywords:
+            _expect(keyword, str, what + ".exclude_title_keywords")
+            # An empty pattern matches every title and rejects every offer
+            if not keyword.strip():
+                raise ValueError("%s.exclude_title_keywords has a blank keyword" % what)
+        pattern = re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+        predicates.append(lambda offer: not pattern.search(offer.title or ""))
+
+    currency = _expect(
+        rules.get("currency", DEFAULT_PRICE_CURRENCY), str, what + ".currency"
+    )
+    getters: dict[str, Callable[[Offer], Optional[float]]] = {
+        "price": _price_getter(currency),
+        "rooms": lambda offer: offer.rooms,
+        "area": lambda offer: offer.area,
+        "price_per_room": _price_per_room_getter(currency),
+    }
+    for key, getter in getters.items():
+        if key in rules:
+            predicates.append(
+                _range_predicate(getter, rules[key], "%s.%s" % (what, key))
+            )
+
+    return predicates
+
+
+def _compile_area(spec: Any, what: str) -> Area:
+    _expect(spec, dict, what)
+    if "polygon" in spec:
+        points = _expect(spec["polygon"], list, what + ".polygon")
+        for point in points:
+            _expect(point, list, what + ".polygon point")
+            if len(point) != 2:
+                raise ValueError("%s.polygon point must be [lat, lon]" % what)
+            for coordinate in point:
+                _expect(coordinate, (int, float), what + ".polygon point")
+        return Polygon(points)
+
+    if "center" in spec and "radius_km" in spec:
+        center = _expect(spec["center"], list, what + ".center")
+        if len(center) != 2:
+            raise ValueError("%s.center must be [lat, lon]" % what)
+        lat, lon = (_expect(c, (int, float), what + ".center") for c in center)
+        radius = _expect(spec["radius_km"], (int, float), what + ".radius_km")
+        if radius <= 0:
+            raise ValueError("%s.radius_km must be positive" % what)
+        return Circle(float(lat), float(lon), float(radius))
+
+    raise ValueError("%s needs either 'polygon' or 'center' and 'radius_km'" % what)
+
+
+class RuleEngine:
+    """Routes offers to the profiles whose rules they satisfy.
+
+    Offers matching no profile are dropped before any photo is downloaded.
+    """
+
+    def __init__(self, profiles: list[Profile], index: GridIndex) -> None:
+        self.profiles = profiles
+        self.index = index
+
+    @classmethod
+    def from_dict(cls, config: Any) -> RuleEngine:
+        """Compile a rules document, raising ValueError if it is malformed."""
+        _expect(config, dict, "Filter rules")
+        _expect_keys(config, {"profiles", "grid_cell_degrees"}, "Filter rules")
+        cell_degrees = _expect(
+            config.get("grid_cell_degrees", FILTER_GRID_CELL_DEGREES),
+            (int, float),
+            "grid_cell_degrees",
+        )
+        if cell_degrees <= 0:
+            raise ValueError("grid_cell_degrees must be positive")
+
+        index = GridIndex(float(cell_degrees))
+        profiles = []
+
+        specs = _expect(config.get("profiles", []), list, "profiles")
+        for number, spec in enumerate(specs, start=1):
+            what = "profiles[%d]" % (number - 1)
+            _expect(spec, dict, what)
+            _expect_keys(spec, PROFILE_KEYS, what)
+            areas = _expect(spec.get("areas", []), list, what + ".areas")
+            area_ids = {
+                index.add(_compile_area(area, "%s.areas[%d]" % (what, i)))
+                for i, area in enumerate(areas)
+            }
+            profiles.append(
+                Profile(
+                    name=_expect(
+                        spec.get("name", "profile-%d" % number), str, what + ".name"
+                    ),
+                    predicates=_compile_predicates(spec, what),
+                    area_ids=area_ids,
+                    channel_id=_expect(
+                        spec.get("channel_id", TELEGRAM_CHANNEL_ID),
+                        int,
+                        what + ".channel_id",
+                    ),
+                )
+            )
+
+        if not profiles:
+            raise ValueError("Filter rules define no profiles")
+        return cls(profiles, index)
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional[RuleEngine]:
+        if not os.path.exists(path):
+            return None
+
+        with open(path, encoding="utf-8") as f:
+            engine = cls.from_dict(json.load(f))
+
+        logger.info(
+            "Loaded %d filter profile(s) from %s" % (len(engine.profiles), path)
+        )
+        return engine
+
+    def route(self, offer: Offer) -> list[Profile]:
+        matched_areas: set[int] = set()
+        if offer.map and offer.map.lat is not None and offer.map.lon is not None:
+            matched_areas = self.index.lookup(offer.map.lat, offer.map.lon)
+
+        return [
+            profile
+            for profile in self.profiles
+            if profile.matches(offer, matched_areas)
+        ]
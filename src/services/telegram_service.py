@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import io
 import os
 import pathlib
@@ -5,12 +7,9 @@ import random
 import time
 from contextlib import suppress
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Sequence
 
-import telebot
 from loguru import logger
-from selectolax.lexbor import LexborHTMLParser
-from telebot import types
 
 from ..core.config import (
     MAX_DESCRIPTION_LENGTH,
@@ -18,7 +17,12 @@ from ..core.config import (
     TELEGRAM_BOT_TOKEN,
     TELEGRAM_CHANNEL_ID,
 )
-from ..core.models import Offer
+
+if TYPE_CHECKING:
+    import telebot
+    from telebot import types
+
+    from ..core.models import Offer
 
 
 class TelegramService:
@@ -28,24 +32,51 @@ class TelegramService:
         token: str = TELEGRAM_BOT_TOKEN,
         channel_id: int = TELEGRAM_CHANNEL_ID,
     ) -> None:
-        self.bot = telebot.TeleBot(token, parse_mode="HTML", num_threads=5)
+        self.token = token
         self.channel_id = channel_id
+        self._bot: Optional[telebot.TeleBot] = None
         logger.info("Telegram service initialized")
 
-    def send_offer_message(self, offer: Offer, photo: Optional[str] = None) -> bool:
+    @property
+    def bot(self) -> telebot.TeleBot:
+        # Built on first send so ticks without new offers never touch telebot
+        if self._bot is None:
+            import telebot
+
+            self._bot = telebot.TeleBot(self.token, parse_mode="HTML", num_threads=5)
+            logger.debug("Telegram bot client created")
+        return self._bot
+
+    def send_offer_message(
+        self,
+        offer: Offer,
+        photo: Optional[str] = None,
+        channel_ids: Optional[Sequence[int]] = None,
+    ) -> bool:
         try:
             message_text = self._format_offer_message(offer)
             reply_markup = self._create_offer_keyboard(offer)
 
-            if photo is None:
-                success = self._send_text_message(message_text, reply_markup)
-            else:
-                success = self._send_photo_message(message_text, photo, reply_markup)
-
-            if success:
-                self._random_delay()
-
-            return success
+            sent = 0
+            for channel_id in channel_ids or [self.channel_id]:
+                if photo is None:
+                    success = self._send_text_message(
+                        channel_id, message_text, reply_markup
+                    )
+                else:
+                    success = self._send_photo_message(
+                        channel_id, message_text, photo, reply_markup
+                    )
+
+                if success:
+                    sent += 1
+                    self._random_delay()
+                else:
+                    logger.warning(
+                        "Failed to send offer %s to channel %s" % (offer.id, channel_id)
+                    )
+
+            return sent > 0
 
         except Exception as e:
             logger.exception("Error sending message for offer %s: %s" % (offer.id, e))
@@ -135,6 +166,8 @@ class TelegramService:
         if not text:
             return ""
 
+        from selectolax.lexbor import LexborHTMLParser
+
         clean_parser = LexborHTMLParser(text)
         clean_text = clean_parser.text(strip=True, separator="\n")
 
@@ -145,6 +178,8 @@ class TelegramService:
         return clean_text
 
     def _create_offer_keyboard(self, offer: Offer) -> types.InlineKeyboardMarkup:
+        from telebot import types
+
         keyboard = types.InlineKeyboardMarkup()
         if offer.url:
             button = types.InlineKeyboardButton(
@@ -155,13 +190,16 @@ class TelegramService:
 
     def _send_photo_message(
         self,
+        channel_id: int,
         caption: str,
         photo: str,
         reply_markup: types.InlineKeyboardMarkup,
     ) -> bool:
+        from telebot import types
+
         try:
             kwargs = {
-                "chat_id": self.channel_id,
+                "chat_id": channel_id,
                 "caption": caption,
                 "reply_markup": reply_markup,
                 "timeout": 10,
@@ -185,11 +223,11 @@ class TelegramService:
             return False
 
     def _send_text_message(
-        self, text: str, reply_markup: types.InlineKeyboardMarkup
+        self, channel_id: int, text: str, reply_markup: types.InlineKeyboardMarkup
     ) -> bool:
         try:
             self.bot.send_message(
-                self.channel_id,
+                channel_id,
                 text=text,
                 reply_markup=reply_markup,
                 disable_web_page_preview=True,
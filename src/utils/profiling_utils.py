@@ -0,0 +1,78 @@
+import cProfile
+import functools
+import os
+import time
+from datetime import datetime
+from typing import Callable
+
+from loguru import logger
+
+
+class TickProfiler:
+    """Profiles scheduler ticks and keeps pstats dumps of the slow ones.
+
+    Only the calling thread is profiled; image downloads run in a pool and
+    show up as time spent waiting on their futures.
+    """
+
+    def __init__(
+        self,
+        threshold_seconds: float,
+        output_dir: str,
+        max_profiles: int,
+    ) -> None:
+        self.threshold_seconds = threshold_seconds
+        self.output_dir = output_dir
+        self.max_profiles = max_profiles
+
+    def wrap(self, func: Callable[[], None]) -> Callable[[], None]:
+        @functools.wraps(func)
+        def profiled() -> None:
+            self.run(func)
+
+        return profiled
+
+    def run(self, func: Callable[[], None]) -> None:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            func()
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold_seconds:
+                self._dump(profiler, elapsed)
+
+    def _dump(self, profiler: cProfile.Profile, elapsed: float) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(
+            self.output_dir, "tick-%s-%.0fs.prof" % (timestamp, elapsed)
+        )
+
+        try:
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.warning("Failed to write tick profile: %s" % e)
+            return
+
+        logger.warning(
+            "Slow tick took %.1f second(s), profile saved to %s" % (elapsed, path)
+        )
+        self._prune()
+
+    def _prune(self) -> None:
+        profiles = sorted(
+            (
+                os.path.join(self.output_dir, name)
+                for name in os.listdir(self.output_dir)
+                if name.startswith("tick-") and name.endswith(".prof")
+            ),
+            key=os.path.getmtime,
+        )
+        for path in profiles[: max(len(profiles) - self.max_profiles, 0)]:
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning("Failed to remove old profile %s: %s" % (path, e))
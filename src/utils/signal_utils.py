@@ -0,0 +1,61 @@
+import signal
+import threading
+from types import FrameType
+from typing import Callable, Optional
+
+
+class ShutdownTimeout(BaseException):
+    """Raised in the main thread when draining outlives its deadline.
+
+    Derives from BaseException so the broad ``except Exception`` handlers in
+    the services let it through, while their ``finally`` blocks still clean
+    up temp folders and collage files.
+    """
+
+
+class SignalHandler:
+    """Turns SIGTERM/SIGHUP into flags the main loop can act on.
+
+    Handlers only set events and arm a timer; logging or I/O from inside a
+    signal handler could deadlock on locks held by the interrupted code.
+    """
+
+    def __init__(
+        self,
+        drain_timeout: float,
+        on_terminate: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.drain_timeout = drain_timeout
+        self.on_terminate = on_terminate
+        self.terminating = threading.Event()
+        self.reload_requested = threading.Event()
+
+    def install(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_terminate)
+        # SIGHUP and SIGALRM do not exist on Windows
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._handle_hangup)
+        if hasattr(signal, "SIGALRM"):
+            signal.signal(signal.SIGALRM, self._handle_alarm)
+
+    def disarm(self) -> None:
+        """Cancel a pending drain deadline."""
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def _handle_terminate(self, signum: int, frame: Optional[FrameType]) -> None:
+        if self.terminating.is_set():
+            # A second SIGTERM means stop waiting for in-flight work
+            raise ShutdownTimeout()
+
+        self.terminating.set()
+        if self.on_terminate is not None:
+            self.on_terminate()
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, self.drain_timeout)
+
+    def _handle_hangup(self, signum: int, frame: Optional[FrameType]) -> None:
+        self.reload_requested.set()
+
+    def _handle_alarm(self, signum: int, frame: Optional[FrameType]) -> None:
+        raise ShutdownTimeout()